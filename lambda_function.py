@@ -1,27 +1,53 @@
 
 import os
 import json
-import base64
-import math
 import re
+import sys
+import time
+import traceback
+from binascii import a2b_base64
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, Mapping
-import traceback
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 try:
-    import boto3  # Provided in AWS runtime; optional locally
+    # botocore ships with the AWS runtime; using it directly skips boto3's
+    # session/resource layer during cold start. Optional locally.
+    from botocore.config import Config
+    from botocore.session import Session
 except Exception:  # ModuleNotFoundError or others
-    boto3 = None
+    Config = None
+    Session = None
 
 
 # Globals
-S3 = None  # Lazy init to allow local dry-run without boto3
 RAW_BUCKET_NAME = os.getenv("RAW_BUCKET_NAME", "zoolanding-data-raw")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-DRY_RUN = os.getenv("DRY_RUN", "0") in {"1", "true", "TRUE", "yes", "YES"}
+_LEVELS = {"DEBUG": 10, "INFO": 20, "ERROR": 40}
+_THRESHOLD = _LEVELS.get(LOG_LEVEL, 20)  # Resolved once; LOG_LEVEL is fixed per container
+_DEBUG = _THRESHOLD <= _LEVELS["DEBUG"]  # Guard DEBUG call sites so their fields are not built
+# Env flags are read and coerced to bool once per container.
+TRUTHY_ENV_VALUES = frozenset({"1", "true", "TRUE", "yes", "YES"})
+DRY_RUN = os.getenv("DRY_RUN", "0") in TRUTHY_ENV_VALUES
+INCLUDE_STACK = os.getenv("INCLUDE_STACK", "0") in TRUTHY_ENV_VALUES
+MAX_BODY_BYTES = int(os.getenv("MAX_BODY_BYTES", "1048576"))
+JSON_WHITESPACE = b" \t\r\n"
+BATCH_EVENT_SOURCES = frozenset({"aws:sqs", "aws:kinesis"})
+AWS_REGION = os.getenv("AWS_REGION") or os.getenv("AWS_DEFAULT_REGION")
+_RESPONSE_HEADERS = {
+    "Content-Type": "application/json",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Content-Type,Authorization",
+    "Access-Control-Allow-Methods": "POST,OPTIONS",
+}
+_SERVER_ERROR_BODY = '{"ok":false,"error":"Internal error"}'
 TIMESTAMP_MS_THRESHOLD = 10**12
+_UTC = timezone.utc
+_INF = (float("inf"), float("-inf"))
+SECONDS_PER_DAY = 86_400
+MS_PER_DAY = SECONDS_PER_DAY * 1000
+_DATE_PARTS_CACHE: tuple[int, tuple[str, str, str], str] | None = None  # (UTC day index, parts, "YYYY/MM/DD")
 SAFE_ID_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789._-")
 BLOG_SENSITIVE_FIELDS = {
     "email",
@@ -89,13 +115,14 @@ class EventTime:
         return metadata
 
 
-def _should_log(level: str) -> bool:
-    order = {"DEBUG": 10, "INFO": 20, "ERROR": 40}
-    return order.get(level, 20) >= order.get(LOG_LEVEL, 20)
+def _json_dumps(value: Any) -> bytes:
+    # Compact UTF-8 JSON as bytes so log lines go to stdout without another
+    # encode pass.
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
 
 
 def _log(level: str, message: str, **fields: Any) -> None:
-    if not _should_log(level):
+    if _LEVELS.get(level, 20) < _THRESHOLD:
         return
     record = {
         "level": level,
@@ -103,22 +130,44 @@ def _log(level: str, message: str, **fields: Any) -> None:
         **fields,
     }
     try:
-        print(json.dumps(record, ensure_ascii=False))
+        line = _json_dumps(record) + b"\n"
     except Exception:
         # Fallback to plain print if non-serializable
         print({"level": level, "message": message, "_text": str(fields)})
+        return
+    # Look stdout up per call so redirect_stdout / unittest -b still capture
+    # logs; text-only streams have no binary buffer and go through print.
+    stdout = sys.stdout
+    buffer = getattr(stdout, "buffer", None)
+    if buffer is None:
+        print(line.decode("utf-8"), end="", flush=True)
+        return
+    # Flush pending text first to keep ordering with print output, then flush
+    # the record itself: Lambda freezes the container after each invoke, so
+    # an unflushed line would surface under a later request or be lost.
+    stdout.flush()
+    buffer.write(line)
+    buffer.flush()
+
+
+def _error_stack(error: BaseException) -> str:
+    # Full tracebacks walk every frame and build a large string; only pay for
+    # that when INCLUDE_STACK is set, otherwise log the exception type.
+    if INCLUDE_STACK:
+        return traceback.format_exc()
+    return f"{type(error).__name__}: {error}"
 
 
 def _json_response(status: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return _encoded_response(status, json.dumps(payload, separators=(",", ":")))
+
+
+def _encoded_response(status: int, body: str) -> Dict[str, Any]:
+    # Headers are shared across responses; treat _RESPONSE_HEADERS as read-only.
     return {
         "statusCode": status,
-        "headers": {
-            "Content-Type": "application/json",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Content-Type,Authorization",
-            "Access-Control-Allow-Methods": "POST,OPTIONS",
-        },
-        "body": json.dumps(payload, separators=(",", ":")),
+        "headers": _RESPONSE_HEADERS,
+        "body": body,
     }
 
 
@@ -127,7 +176,7 @@ def _bad_request(msg: str) -> Dict[str, Any]:
 
 
 def _server_error() -> Dict[str, Any]:
-    return _json_response(500, {"ok": False, "error": "Internal error"})
+    return _encoded_response(500, _SERVER_ERROR_BODY)
 
 
 def _get_request_id(context: Any) -> str:
@@ -141,27 +190,42 @@ def _get_request_id(context: Any) -> str:
         # a request-scoped uniqueness hint from the Lambda invocation.
         return request_id[-8:]
     # Fallback to a short timestamp-based suffix for local or synthetic invocations.
-    return hex(int(datetime.now(tz=timezone.utc).timestamp() * 1000))[-8:]
+    return f"{time.time_ns() & 0xFFFFFFFF:08x}"
 
 
-def _decode_body(event: Dict[str, Any]) -> str:
+def _decode_body(event: Dict[str, Any]) -> bytes:
     body = event.get("body")
     if body is None or body == "":
         raise ValueError("Missing body")
     is_base64_encoded = event.get("isBase64Encoded", False)
     if is_base64_encoded:
         # API Gateway-compatible invokers may deliver the request body as base64.
+        # binascii is the C codec behind base64.b64decode, minus its wrapper.
         if isinstance(body, str):
-            return base64.b64decode(body).decode("utf-8")
+            return a2b_base64(body.encode("ascii"))
         raise ValueError("Body is base64Encoded but not a string")
-    if isinstance(body, (str, bytes)):
-        return body.decode("utf-8") if isinstance(body, (bytes, bytearray)) else body
+    # Keep the body as bytes end-to-end: the JSON parser and S3 both take
+    # bytes, so decoding to str here would only be re-encoded later.
+    if isinstance(body, str):
+        return body.encode("utf-8")
+    if isinstance(body, (bytes, bytearray)):
+        return bytes(body)
     # Some invokers might already pass dict; accept it by re-serializing
-    return json.dumps(body)
+    return json.dumps(body).encode("utf-8")
+
+
+def _starts_with_json_object(body: bytes) -> bool:
+    # bytes.lstrip runs in C, so even a body of pure whitespace costs one
+    # linear pass; it copies the remainder, which MAX_BODY_BYTES bounds.
+    return body.lstrip(JSON_WHITESPACE)[:1] == b"{"
 
 
 def _normalize_timestamp_to_ms(ts: Any) -> int:
-    if not isinstance(ts, (int, float)) or not math.isfinite(ts):
+    if isinstance(ts, bool) or not isinstance(ts, (int, float)):
+        raise ValueError("Missing or invalid timestamp")
+    # NaN is the only value not equal to itself; the stdlib JSON fallback
+    # parses NaN/Infinity literals, so reject them here.
+    if isinstance(ts, float) and (ts != ts or ts in _INF):
         raise ValueError("Missing or invalid timestamp")
     # Accept both epoch seconds and epoch milliseconds so older or simpler
     # clients do not need an exact timestamp unit contract.
@@ -169,10 +233,28 @@ def _normalize_timestamp_to_ms(ts: Any) -> int:
     return ts_ms
 
 
-def _derive_date_parts(ts_ms: int) -> tuple[str, str, str]:
+def _utc_day(ts_ms: int) -> tuple[tuple[str, str, str], str]:
+    global _DATE_PARTS_CACHE
     # Use UTC for partition keys to avoid locale- or DST-dependent drift.
-    dt = datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc)
-    return dt.strftime("%Y"), dt.strftime("%m"), dt.strftime("%d")
+    # Warm containers mostly see events from the same UTC day, so remember
+    # the last day's parts and skip the conversion on a hit.
+    day = ts_ms // MS_PER_DAY
+    cached = _DATE_PARTS_CACHE
+    if cached is not None and cached[0] == day:
+        return cached[1], cached[2]
+    dt = datetime.fromtimestamp(day * SECONDS_PER_DAY, tz=_UTC)
+    parts = (f"{dt.year:04d}", f"{dt.month:02d}", f"{dt.day:02d}")
+    prefix = "/".join(parts)
+    _DATE_PARTS_CACHE = (day, parts, prefix)
+    return parts, prefix
+
+
+def _derive_date_parts(ts_ms: int) -> tuple[str, str, str]:
+    return _utc_day(ts_ms)[0]
+
+
+def _day_prefix(ts_ms: int) -> str:
+    return _utc_day(ts_ms)[1]
 
 
 def _format_iso(dt: datetime) -> str:
@@ -184,7 +266,7 @@ def _format_iso(dt: datetime) -> str:
 
 
 def _event_time_from_payload(ts_ms: int, payload: Mapping[str, Any]) -> EventTime:
-    utc_dt = datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc)
+    utc_dt = datetime.fromtimestamp(ts_ms / 1000.0, tz=_UTC)
     timezone_name = payload.get("timezone")
     if not isinstance(timezone_name, str) or not timezone_name.strip():
         return EventTime(timestamp_ms=ts_ms, utc=_format_iso(utc_dt))
@@ -268,33 +350,225 @@ def _reject_blog_sensitive_node(value: Any) -> None:
         raise ValueError("Blog analytics events must not include private values")
 
 
-def _get_s3_client():
-    global S3
-    if S3 is not None:
-        return S3
-    if DRY_RUN:
-        # Local dry-runs should exercise the handler flow without requiring AWS creds.
-        _log("DEBUG", "DRY_RUN enabled; skipping S3 client init")
+def _validate_payload(payload: Mapping[str, Any]) -> tuple[str, int]:
+    # Single validation pass over the parsed body; every failure is a
+    # ValueError so the handler maps it to one 400 response.
+    app_name = payload.get("appName")
+    if not isinstance(app_name, str) or not app_name.strip():
+        raise ValueError("Missing or invalid appName")
+    ts_ms = _normalize_timestamp_to_ms(payload.get("timestamp"))
+    _validate_blog_event(payload)
+    return app_name, ts_ms
+
+
+def _record_item_id(record: Mapping[str, Any]) -> Any:
+    # Partial-batch item identifier: SQS messageId or Kinesis sequenceNumber.
+    kinesis = record.get("kinesis")
+    if isinstance(kinesis, Mapping):
+        return kinesis.get("sequenceNumber")
+    return record.get("messageId")
+
+
+def _record_body(record: Mapping[str, Any]) -> bytes:
+    # Raw event bytes for an SQS or Kinesis record.
+    kinesis = record.get("kinesis")
+    if isinstance(kinesis, Mapping):
+        data = kinesis.get("data")
+        if not isinstance(data, str) or not data:
+            raise ValueError("Missing body")
+        return a2b_base64(data.encode("ascii"))
+    return _decode_body({"body": record.get("body")})
+
+
+def _parse_record_payload(body_bytes: bytes) -> tuple[str, int]:
+    if len(body_bytes) > MAX_BODY_BYTES:
+        raise ValueError("Body is too large")
+    if not _starts_with_json_object(body_bytes):
+        raise ValueError("Body JSON must be an object")
+    try:
+        payload = json.loads(body_bytes)
+    except Exception:
+        raise ValueError("Body is not valid JSON") from None
+    if not isinstance(payload, dict):
+        raise ValueError("Body JSON must be an object")
+    return _validate_payload(payload)
+
+
+def _create_s3_client() -> Any:
+    if Session is None or DRY_RUN:
+        # Local dry-runs do not need botocore or AWS config.
         return None
-    if boto3 is None:
-        _log("ERROR", "boto3 not available and DRY_RUN is disabled; cannot upload to S3")
-        raise RuntimeError("boto3 is not available and DRY_RUN is disabled; cannot upload to S3")
-    S3 = boto3.client("s3")
-    _log("DEBUG", "Initialized S3 client")
-    return S3
+    if os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        # Lambda injects credentials and region through env vars, so skip the
+        # instance-metadata probes botocore would otherwise try on cold start.
+        # Local runs keep the default credential chain.
+        os.environ.setdefault("AWS_EC2_METADATA_DISABLED", "true")
+        os.environ.setdefault("AWS_STS_REGIONAL_ENDPOINTS", "regional")
+    try:
+        client = Session().create_client(
+            "s3",
+            config=Config(
+                region_name=AWS_REGION,
+                signature_version="s3v4",
+                s3={"addressing_style": "virtual"},
+                connect_timeout=1,
+                read_timeout=3,
+                tcp_keepalive=True,
+                retries={"max_attempts": 2, "mode": "standard"},
+                max_pool_connections=4,
+            ),
+        )
+    except Exception as e:
+        _log("ERROR", "S3 client init failed", error=str(e), stack=_error_stack(e))
+        return None
+    try:
+        # The first put_object otherwise lazily loads the PutObject operation
+        # model, resolves the endpoint ruleset, and builds the SigV4 signer.
+        # Presigning runs all of that locally (no network call) during init.
+        client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": RAW_BUCKET_NAME, "Key": "warmup"},
+            ExpiresIn=60,
+        )
+    except Exception:
+        # Warming is best-effort; the first upload pays the cost instead.
+        pass
+    return client
+
+
+# Build the client during Lambda init, which is not billed, instead of on the
+# first request after a cold start. None when DRY_RUN is set or init failed.
+S3 = _create_s3_client()
+
+
+def _is_queue_batch(records: Any) -> bool:
+    # Only SQS and Kinesis deliver analytics bodies; other Records events
+    # (S3 or SNS notifications) are not batches this Lambda understands.
+    return (
+        isinstance(records, list)
+        and bool(records)
+        and isinstance(records[0], Mapping)
+        and records[0].get("eventSource") in BATCH_EVENT_SOURCES
+    )
+
+
+def _handle_batch(records: list[Any], short_request_id: str) -> Dict[str, Any]:
+    # Queue/stream invocations group valid records by app and UTC day and
+    # write each group as one NDJSON object, so N events cost one PUT.
+    groups: Dict[tuple[str, str], tuple[int, bytearray, list[Any]]] = {}
+    failures: list[Dict[str, Any]] = []
+    for record in records:
+        item_id = _record_item_id(record) if isinstance(record, Mapping) else None
+        try:
+            if not isinstance(record, Mapping):
+                raise ValueError("Record is not an object")
+            body_bytes = _record_body(record)
+            app_name, ts_ms = _parse_record_payload(body_bytes)
+            group_key = (app_name, _day_prefix(ts_ms))
+        except ValueError as e:
+            # Invalid payloads cannot succeed on retry, so they are logged and
+            # dropped rather than reported as batch item failures.
+            _log("ERROR", "Dropped invalid batch record", requestId=short_request_id, itemId=item_id, error=str(e))
+            continue
+        except Exception as e:
+            # Anything else is an internal failure; report it so the event
+            # source retries the record instead of losing it.
+            _log(
+                "ERROR",
+                "Batch record failed",
+                requestId=short_request_id,
+                itemId=item_id,
+                error=str(e),
+                stack=_error_stack(e),
+            )
+            if item_id is not None:
+                failures.append({"itemIdentifier": item_id})
+            continue
+        if group_key not in groups:
+            groups[group_key] = (ts_ms, bytearray(), [])
+        _, buffer, item_ids = groups[group_key]
+        # JSON strings cannot hold raw newlines, so stripping CR/LF only
+        # removes insignificant whitespace and keeps one record per line.
+        if b"\n" in body_bytes or b"\r" in body_bytes:
+            body_bytes = body_bytes.replace(b"\r", b"").replace(b"\n", b"")
+        buffer.extend(body_bytes)
+        buffer.extend(b"\n")
+        item_ids.append(item_id)
+
+    for (app_name, day_prefix), (ts_ms, body, item_ids) in groups.items():
+        key = app_name + "/" + day_prefix + "/batch-" + str(ts_ms) + "-" + short_request_id + ".ndjson"
+        if DRY_RUN:
+            _log(
+                "INFO",
+                "Dry-run: would upload batch",
+                requestId=short_request_id,
+                appName=app_name,
+                bucket=RAW_BUCKET_NAME,
+                key=key,
+                size=len(body),
+                records=len(item_ids),
+                dryRun=True,
+            )
+            continue
+        try:
+            if S3 is None:
+                raise RuntimeError("S3 client is not available and DRY_RUN is disabled; cannot upload to S3")
+            S3.put_object(
+                Bucket=RAW_BUCKET_NAME,
+                Key=key,
+                Body=body,
+                ContentType="application/x-ndjson",
+                Metadata={"record-count": str(len(item_ids))},
+            )
+            _log(
+                "INFO",
+                "Uploaded analytics batch",
+                requestId=short_request_id,
+                appName=app_name,
+                bucket=RAW_BUCKET_NAME,
+                key=key,
+                size=len(body),
+                records=len(item_ids),
+            )
+        except Exception as s3_error:
+            _log(
+                "ERROR",
+                "S3 batch upload failed",
+                requestId=short_request_id,
+                appName=app_name,
+                bucket=RAW_BUCKET_NAME,
+                key=key,
+                error=str(s3_error),
+                stack=_error_stack(s3_error),
+            )
+            # Report the whole group so the event source retries only it.
+            failures.extend({"itemIdentifier": item_id} for item_id in item_ids if item_id is not None)
+
+    return {"batchItemFailures": failures}
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     short_request_id = _get_request_id(context)
 
+    if isinstance(event, Mapping) and _is_queue_batch(event.get("Records")):
+        return _handle_batch(event["Records"], short_request_id)
+
     try:
         # 1) Decode body
-        body_str = _decode_body(event)
-        _log("DEBUG", "Decoded body", requestId=short_request_id, decodedLen=len(body_str))
-
-        # 2) Parse JSON
+        body_bytes = _decode_body(event)
+        if _DEBUG:
+            _log("DEBUG", "Decoded body", requestId=short_request_id, decodedLen=len(body_bytes))
+
+        # 2) Parse JSON, rejecting oversized or obviously non-object bodies
+        # before paying for a full parse.
+        if len(body_bytes) > MAX_BODY_BYTES:
+            _log("ERROR", "Body too large", requestId=short_request_id, size=len(body_bytes), maxSize=MAX_BODY_BYTES)
+            return _bad_request("Body is too large")
+        if not _starts_with_json_object(body_bytes):
+            _log("ERROR", "Body JSON is not an object", requestId=short_request_id)
+            return _bad_request("Body JSON must be an object")
         try:
-            payload = json.loads(body_str)
+            payload = json.loads(body_bytes)
         except Exception as e:
             _log("ERROR", "Invalid JSON", requestId=short_request_id, error=str(e))
             return _bad_request("Body is not valid JSON")
@@ -303,51 +577,43 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             return _bad_request("Body JSON must be an object")
 
         # 3) Validate fields
-        app_name = payload.get("appName")
-        if not isinstance(app_name, str) or not app_name.strip():
-            _log("ERROR", "Invalid appName", requestId=short_request_id)
-            return _bad_request("Missing or invalid appName")
-
         try:
-            ts_ms = _normalize_timestamp_to_ms(payload.get("timestamp"))
+            app_name, ts_ms = _validate_payload(payload)
         except ValueError as e:
-            _log("ERROR", str(e), requestId=short_request_id, appName=app_name)
+            _log("ERROR", str(e), requestId=short_request_id, appName=payload.get("appName"))
             return _bad_request(str(e))
-        try:
-            _validate_blog_event(payload)
-        except ValueError as e:
-            _log("ERROR", str(e), requestId=short_request_id, appName=app_name)
-            return _bad_request(str(e))
-        _log(
-            "DEBUG",
-            "Validated payload",
-            requestId=short_request_id,
-            appName=app_name,
-            timestampType=type(payload.get("timestamp")).__name__,
-            timestampMs=ts_ms,
-            keys=list(payload.keys())[:12],
-        )
+        if _DEBUG:
+            _log(
+                "DEBUG",
+                "Validated payload",
+                requestId=short_request_id,
+                appName=app_name,
+                timestampType=type(payload.get("timestamp")).__name__,
+                timestampMs=ts_ms,
+                keys=list(payload.keys())[:12],
+            )
 
-        # 4) Derive date parts (UTC) and optional viewer-local time fields.
-        yyyy, mm, dd = _derive_date_parts(ts_ms)
+        # 4) Derive the UTC day prefix and optional viewer-local time fields.
+        day_prefix = _day_prefix(ts_ms)
         event_time = _event_time_from_payload(ts_ms, payload)
-        _log(
-            "DEBUG",
-            "Derived date parts",
-            requestId=short_request_id,
-            yyyy=yyyy,
-            mm=mm,
-            dd=dd,
-            eventTime=event_time.to_response(),
-        )
+        if _DEBUG:
+            yyyy, mm, dd = _derive_date_parts(ts_ms)
+            _log(
+                "DEBUG",
+                "Derived date parts",
+                requestId=short_request_id,
+                yyyy=yyyy,
+                mm=mm,
+                dd=dd,
+                eventTime=event_time.to_response(),
+            )
 
         # 5) Build S3 key
         # Prefix by app and UTC calendar date so downstream jobs can read by
         # app/day without scanning unrelated raw objects.
-        key = f"{app_name}/{yyyy}/{mm}/{dd}/{ts_ms}-{short_request_id}.json"
+        key = app_name + "/" + day_prefix + "/" + str(ts_ms) + "-" + short_request_id + ".json"
 
-        # 6) Upload original, unchanged body string
-        body_bytes = body_str.encode("utf-8")
+        # 6) Upload original, unchanged body bytes
         size_bytes = len(body_bytes)
         if DRY_RUN:
             _log(
@@ -364,10 +630,11 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             )
         else:
             try:
-                s3 = _get_s3_client()
+                if S3 is None:
+                    raise RuntimeError("S3 client is not available and DRY_RUN is disabled; cannot upload to S3")
                 # Store the raw JSON exactly as received. Any enrichment or
                 # normalization beyond the key naming belongs to later stages.
-                s3.put_object(
+                S3.put_object(
                     Bucket=RAW_BUCKET_NAME,
                     Key=key,
                     Body=body_bytes,
@@ -394,7 +661,7 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
                     bucket=RAW_BUCKET_NAME,
                     key=key,
                     error=str(s3_error),
-                    stack=traceback.format_exc(),
+                    stack=_error_stack(s3_error),
                 )
                 # Server error for unexpected S3 failures
                 return _server_error()
@@ -415,5 +682,5 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         return _bad_request(str(ve))
     except Exception as ex:
         # Anything else is treated as an internal failure such as S3 or runtime issues.
-        _log("ERROR", "Unhandled error", requestId=short_request_id, error=str(ex), stack=traceback.format_exc())
+        _log("ERROR", "Unhandled error", requestId=short_request_id, error=str(ex), stack=_error_stack(ex))
         return _server_error()
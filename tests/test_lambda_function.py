@@ -1,3 +1,6 @@
+import base64
+import contextlib
+import io
 import json
 import unittest
 
@@ -16,22 +19,24 @@ class FakeS3Client:
         self.put_object_calls.append(kwargs)
 
 
+class FailingS3Client:
+    def put_object(self, **kwargs):
+        raise RuntimeError("simulated S3 outage")
+
+
 class DataDropperLambdaTests(unittest.TestCase):
     def setUp(self):
         self.original_dry_run = lambda_function.DRY_RUN
         self.original_bucket_name = lambda_function.RAW_BUCKET_NAME
-        self.original_log_level = lambda_function.LOG_LEVEL
         self.original_log = lambda_function._log
         self.original_s3 = lambda_function.S3
         lambda_function.RAW_BUCKET_NAME = "unit-test-bucket"
-        lambda_function.LOG_LEVEL = "ERROR"
         lambda_function._log = lambda *args, **kwargs: None
         lambda_function.S3 = None
 
     def tearDown(self):
         lambda_function.DRY_RUN = self.original_dry_run
         lambda_function.RAW_BUCKET_NAME = self.original_bucket_name
-        lambda_function.LOG_LEVEL = self.original_log_level
         lambda_function._log = self.original_log
         lambda_function.S3 = self.original_s3
 
@@ -88,6 +93,8 @@ class DataDropperLambdaTests(unittest.TestCase):
             upload["Key"],
             "zoo_landing_page/2025/08/27/1756272600000-567890ab.json",
         )
+        self.assertEqual(upload["Bucket"], "unit-test-bucket")
+        self.assertEqual(upload["ContentType"], "application/json")
         self.assertEqual(upload["Body"], raw_body.encode("utf-8"))
         self.assertEqual(upload["Metadata"]["timestamp-ms"], "1756272600000")
         self.assertEqual(upload["Metadata"]["event-time-utc"], "2025-08-27T05:30:00Z")
@@ -96,6 +103,161 @@ class DataDropperLambdaTests(unittest.TestCase):
         self.assertEqual(upload["Metadata"]["event-local-date"], "2025-08-26")
         self.assertEqual(upload["Metadata"]["event-local-hour"], "23")
 
+    def test_base64_body_is_uploaded_as_the_original_bytes(self):
+        lambda_function.DRY_RUN = False
+        fake_s3 = FakeS3Client()
+        lambda_function.S3 = fake_s3
+        raw_body = '{"appName":"zoolanding-web","timestamp":1725148800000,"label":"café"}'.encode("utf-8")
+        event = {
+            "isBase64Encoded": True,
+            "body": base64.b64encode(raw_body).decode("ascii"),
+        }
+
+        response = lambda_function.lambda_handler(event, LambdaContext())
+        body = json.loads(response["body"])
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(body["size"], len(raw_body))
+        self.assertEqual(fake_s3.put_object_calls[0]["Body"], raw_body)
+
+    def test_missing_s3_client_without_dry_run_is_a_server_error(self):
+        lambda_function.DRY_RUN = False
+        payload = {"appName": "zoolanding-web", "timestamp": 1725148800000}
+
+        response = lambda_function.lambda_handler(self._event_for(json.dumps(payload)), LambdaContext())
+        body = json.loads(response["body"])
+
+        self.assertEqual(response["statusCode"], 500)
+        self.assertEqual(body, {"ok": False, "error": "Internal error"})
+
+    def test_failed_upload_is_a_server_error(self):
+        lambda_function.DRY_RUN = False
+        lambda_function.S3 = FailingS3Client()
+        payload = {"appName": "zoolanding-web", "timestamp": 1725148800000}
+
+        response = lambda_function.lambda_handler(self._event_for(json.dumps(payload)), LambdaContext())
+        body = json.loads(response["body"])
+
+        self.assertEqual(response["statusCode"], 500)
+        self.assertEqual(body, {"ok": False, "error": "Internal error"})
+
+    def test_error_stack_is_summarized_unless_include_stack_is_set(self):
+        original_include_stack = lambda_function.INCLUDE_STACK
+        try:
+            try:
+                raise RuntimeError("simulated S3 outage")
+            except RuntimeError as error:
+                lambda_function.INCLUDE_STACK = False
+                summary = lambda_function._error_stack(error)
+                lambda_function.INCLUDE_STACK = True
+                stack = lambda_function._error_stack(error)
+        finally:
+            lambda_function.INCLUDE_STACK = original_include_stack
+
+        self.assertEqual(summary, "RuntimeError: simulated S3 outage")
+        self.assertIn("Traceback (most recent call last)", stack)
+
+    def test_sqs_batch_groups_records_by_app_and_day_into_one_ndjson_object(self):
+        lambda_function.DRY_RUN = False
+        fake_s3 = FakeS3Client()
+        lambda_function.S3 = fake_s3
+        first = '{"appName":"zoolanding-web","timestamp":1725148800000,"name":"page_view"}'
+        second = '{\n  "appName": "zoolanding-web",\n  "timestamp": 1725148900000\n}'
+        event = {
+            "Records": [
+                {"eventSource": "aws:sqs", "messageId": "m-1", "body": first},
+                {"eventSource": "aws:sqs", "messageId": "m-2", "body": "[]"},
+                {"eventSource": "aws:sqs", "messageId": "m-3", "body": second},
+            ]
+        }
+
+        response = lambda_function.lambda_handler(event, LambdaContext())
+
+        self.assertEqual(response, {"batchItemFailures": []})
+        self.assertEqual(len(fake_s3.put_object_calls), 1)
+        upload = fake_s3.put_object_calls[0]
+        self.assertEqual(upload["Key"], "zoolanding-web/2024/09/01/batch-1725148800000-567890ab.ndjson")
+        self.assertEqual(upload["Bucket"], "unit-test-bucket")
+        self.assertEqual(upload["ContentType"], "application/x-ndjson")
+        lines = upload["Body"].decode("utf-8").splitlines()
+        self.assertEqual(lines[0], first)
+        self.assertEqual([json.loads(line) for line in lines][1], json.loads(second))
+        self.assertEqual(upload["Metadata"], {"record-count": "2"})
+
+    def test_batch_upload_failure_reports_the_group_items(self):
+        lambda_function.DRY_RUN = False
+        lambda_function.S3 = FailingS3Client()
+        data = base64.b64encode(b'{"appName":"zoolanding-web","timestamp":1725148800000}').decode("ascii")
+        event = {
+            "Records": [
+                {"eventSource": "aws:kinesis", "kinesis": {"sequenceNumber": "seq-1", "data": data}},
+                {"eventSource": "aws:kinesis", "kinesis": {"sequenceNumber": "seq-2", "data": data}},
+            ]
+        }
+
+        response = lambda_function.lambda_handler(event, LambdaContext())
+
+        self.assertEqual(
+            response,
+            {"batchItemFailures": [{"itemIdentifier": "seq-1"}, {"itemIdentifier": "seq-2"}]},
+        )
+
+    def test_batch_record_internal_error_is_reported_not_dropped(self):
+        lambda_function.DRY_RUN = True
+        event = {
+            "Records": [
+                {
+                    "eventSource": "aws:sqs",
+                    "messageId": "m-far-future",
+                    "body": '{"appName":"zoolanding-web","timestamp":1e30}',
+                },
+                {"eventSource": "aws:sqs", "messageId": "m-invalid", "body": "[]"},
+            ]
+        }
+
+        response = lambda_function.lambda_handler(event, LambdaContext())
+
+        self.assertEqual(response, {"batchItemFailures": [{"itemIdentifier": "m-far-future"}]})
+
+    def test_non_object_event_is_a_server_error(self):
+        lambda_function.DRY_RUN = True
+
+        response = lambda_function.lambda_handler(["x"], LambdaContext())
+
+        self.assertEqual(response["statusCode"], 500)
+        self.assertEqual(json.loads(response["body"]), {"ok": False, "error": "Internal error"})
+
+    def test_non_queue_records_event_is_not_treated_as_a_batch(self):
+        lambda_function.DRY_RUN = False
+        fake_s3 = FakeS3Client()
+        lambda_function.S3 = fake_s3
+        event = {"Records": [{"eventSource": "aws:s3", "s3": {"object": {"key": "incoming.json"}}}]}
+
+        response = lambda_function.lambda_handler(event, LambdaContext())
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertNotIn("batchItemFailures", response)
+        self.assertEqual(fake_s3.put_object_calls, [])
+
+    def test_s3_client_init_failure_is_logged(self):
+        lambda_function.DRY_RUN = False
+        original_session = lambda_function.Session
+        logged = []
+
+        def broken_session():
+            raise RuntimeError("bad client config")
+
+        lambda_function.Session = broken_session
+        lambda_function._log = lambda level, message, **fields: logged.append((level, message, fields))
+        try:
+            client = lambda_function._create_s3_client()
+        finally:
+            lambda_function.Session = original_session
+
+        self.assertIsNone(client)
+        self.assertEqual(logged[0][:2], ("ERROR", "S3 client init failed"))
+        self.assertEqual(logged[0][2]["error"], "bad client config")
+
     def test_seconds_timestamp_still_normalizes_to_utc_key(self):
         lambda_function.DRY_RUN = False
         fake_s3 = FakeS3Client()
@@ -116,6 +278,13 @@ class DataDropperLambdaTests(unittest.TestCase):
         )
         self.assertEqual(body["eventTime"], {"timestampMs": 1725148800000, "utc": "2024-09-01T00:00:00Z"})
 
+    def test_date_parts_follow_utc_day_boundaries_across_calls(self):
+        self.assertEqual(lambda_function._derive_date_parts(1725148799999), ("2024", "08", "31"))
+        self.assertEqual(lambda_function._day_prefix(1725148800000), "2024/09/01")
+        self.assertEqual(lambda_function._derive_date_parts(1725148800000), ("2024", "09", "01"))
+        self.assertEqual(lambda_function._derive_date_parts(1725235199999), ("2024", "09", "01"))
+        self.assertEqual(lambda_function._derive_date_parts(1725148799999), ("2024", "08", "31"))
+
     def test_invalid_optional_timezone_does_not_drop_raw_event(self):
         lambda_function.DRY_RUN = True
         payload = {
@@ -131,6 +300,56 @@ class DataDropperLambdaTests(unittest.TestCase):
         self.assertEqual(body["ok"], True)
         self.assertEqual(body["eventTime"], {"timestampMs": 1725148800000, "utc": "2024-09-01T00:00:00Z"})
 
+    def test_non_finite_or_boolean_timestamp_is_rejected(self):
+        for timestamp in (float("nan"), float("inf"), float("-inf"), True):
+            with self.assertRaisesRegex(ValueError, "Missing or invalid timestamp"):
+                lambda_function._normalize_timestamp_to_ms(timestamp)
+
+    def test_responses_carry_json_and_cors_headers(self):
+        lambda_function.DRY_RUN = True
+        payload = {"appName": "zoolanding-web", "timestamp": 1725148800000}
+
+        ok = lambda_function.lambda_handler(self._event_for(json.dumps(payload)), LambdaContext())
+        error = lambda_function._server_error()
+
+        for response in (ok, error):
+            self.assertEqual(response["headers"]["Content-Type"], "application/json")
+            self.assertEqual(response["headers"]["Access-Control-Allow-Origin"], "*")
+            self.assertEqual(response["headers"]["Access-Control-Allow-Methods"], "POST,OPTIONS")
+        self.assertEqual(json.loads(error["body"]), {"ok": False, "error": "Internal error"})
+
+    def test_body_over_size_limit_is_rejected_before_parsing(self):
+        lambda_function.DRY_RUN = True
+        original_max_body_bytes = lambda_function.MAX_BODY_BYTES
+        lambda_function.MAX_BODY_BYTES = 32
+        try:
+            payload = {"appName": "zoolanding-web", "timestamp": 1725148800000}
+            response = lambda_function.lambda_handler(self._event_for(json.dumps(payload)), LambdaContext())
+        finally:
+            lambda_function.MAX_BODY_BYTES = original_max_body_bytes
+        body = json.loads(response["body"])
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertEqual(body, {"ok": False, "error": "Body is too large"})
+
+    def test_leading_whitespace_before_object_is_accepted(self):
+        lambda_function.DRY_RUN = True
+        raw_body = ' \r\n\t{"appName":"zoolanding-web","timestamp":1725148800000}'
+
+        response = lambda_function.lambda_handler(self._event_for(raw_body), LambdaContext())
+
+        self.assertEqual(response["statusCode"], 200)
+
+    def test_missing_app_name_is_rejected(self):
+        lambda_function.DRY_RUN = True
+        payload = {"appName": "  ", "timestamp": 1725148800000}
+
+        response = lambda_function.lambda_handler(self._event_for(json.dumps(payload)), LambdaContext())
+        body = json.loads(response["body"])
+
+        self.assertEqual(response["statusCode"], 400)
+        self.assertEqual(body, {"ok": False, "error": "Missing or invalid appName"})
+
     def test_valid_json_must_be_an_object(self):
         lambda_function.DRY_RUN = True
 
@@ -140,6 +359,49 @@ class DataDropperLambdaTests(unittest.TestCase):
         self.assertEqual(response["statusCode"], 400)
         self.assertEqual(body, {"ok": False, "error": "Body JSON must be an object"})
 
+    def test_log_writes_and_flushes_to_the_current_stdout(self):
+        raw = io.BytesIO()
+        binary_stdout = io.TextIOWrapper(raw, encoding="utf-8")
+        text_stdout = io.StringIO()
+
+        with contextlib.redirect_stdout(binary_stdout):
+            self.original_log("ERROR", "binary", requestId="567890ab")
+            self.assertEqual(json.loads(raw.getvalue()), {"level": "ERROR", "message": "binary", "requestId": "567890ab"})
+        with contextlib.redirect_stdout(text_stdout):
+            self.original_log("ERROR", "text")
+
+        self.assertEqual(json.loads(text_stdout.getvalue()), {"level": "ERROR", "message": "text"})
+
+    def test_request_id_falls_back_to_eight_hex_chars_without_context(self):
+        request_id = lambda_function._get_request_id(None)
+
+        self.assertRegex(request_id, r"^[0-9a-f]{8}$")
+
+    def test_dict_body_and_response_keep_ascii_escaped_json(self):
+        lambda_function.DRY_RUN = False
+        fake_s3 = FakeS3Client()
+        lambda_function.S3 = fake_s3
+        payload = {"appName": "zoolanding-web", "timestamp": 1725148800000, "label": "café"}
+
+        response = lambda_function.lambda_handler({"body": payload}, LambdaContext())
+        bad_request = lambda_function._bad_request("inválido")
+
+        stored = json.dumps(payload).encode("utf-8")
+        self.assertEqual(fake_s3.put_object_calls[0]["Body"], stored)
+        self.assertEqual(json.loads(response["body"])["size"], len(stored))
+        self.assertEqual(bad_request["body"], '{"ok":false,"error":"inv\\u00e1lido"}')
+
+    def test_dict_body_with_wide_integer_is_stored(self):
+        lambda_function.DRY_RUN = False
+        fake_s3 = FakeS3Client()
+        lambda_function.S3 = fake_s3
+        event = {"body": {"appName": "zoolanding-web", "timestamp": 1725148800000, "counter": 2**70}}
+
+        response = lambda_function.lambda_handler(event, LambdaContext())
+
+        self.assertEqual(response["statusCode"], 200)
+        self.assertEqual(json.loads(fake_s3.put_object_calls[0]["Body"])["counter"], 2**70)
+
     def test_blog_event_requires_hub_and_article_ids(self):
         lambda_function.DRY_RUN = True
         payload = {